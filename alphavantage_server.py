@@ -4,8 +4,16 @@ import json
 import os
 import sys
 from typing import Any, Sequence
+from urllib.parse import urlencode
 import httpx
+from cachetools import TTLCache
+from diskcache import Cache
 from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 from mcp.server.models import InitializationOptions
 import mcp.types as types
 from mcp.server import NotificationOptions, Server
@@ -19,132 +27,158 @@ if not API_KEY:
 
 server = Server("alphavantage")
 
+# Shared HTTP client so repeat calls reuse pooled keep-alive connections
+# instead of paying a new TCP+TLS handshake per tool invocation.
+# HTTP/2 multiplexes concurrent requests over one connection to
+# www.alphavantage.co instead of opening a connection per request.
+# Split timeouts so a stalled upstream fails fast instead of pinning a
+# semaphore slot for a blanket 30 seconds. With the brotli extra
+# installed httpx also advertises 'br' and decodes it transparently,
+# shrinking large news payloads beyond what gzip manages.
+_CLIENT = httpx.AsyncClient(
+    timeout=httpx.Timeout(connect=3.0, read=15.0, write=3.0, pool=5.0),
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    http2=True,
+)
 
-@server.list_tools()
-async def handle_list_tools() -> list[types.Tool]:
-    return [
-        types.Tool(
-            name="get_stock_quote",
-            description="Get current stock quote",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "symbol": {"type": "string", "description": "Stock symbol (e.g., AAPL)"}
-                },
-                "required": ["symbol"]
-            }
-        ),
-        types.Tool(
-            name="get_daily_prices",
-            description="Get daily time series data for a stock",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "symbol": {"type": "string", "description": "Stock symbol (e.g., AAPL)"}
-                },
-                "required": ["symbol"]
-            }
-        ),
-        types.Tool(
-            name="get_income_statement",
-            description="Get annual income statement for a company",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "symbol": {"type": "string", "description": "Stock symbol (e.g., AAPL)"}
-                },
-                "required": ["symbol"]
-            }
-        ),
-        types.Tool(
-            name="get_balance_sheet",
-            description="Get annual balance sheet for a company",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "symbol": {"type": "string", "description": "Stock symbol (e.g., AAPL)"}
-                },
-                "required": ["symbol"]
-            }
-        ),
-        types.Tool(
-            name="get_cash_flow",
-            description="Get annual cash flow statement for a company",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "symbol": {"type": "string", "description": "Stock symbol (e.g., AAPL)"}
-                },
-                "required": ["symbol"]
-            }
-        ),
-        types.Tool(
-            name="get_company_overview",
-            description="Get company overview and key metrics",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "symbol": {"type": "string", "description": "Stock symbol (e.g., AAPL)"}
-                },
-                "required": ["symbol"]
-            }
-        ),
-        types.Tool(
-            name="get_news_sentiment",
-            description="Get latest news and sentiment for a stock or topic",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "tickers": {
-                        "type": "string",
-                        "description": "Stock symbol(s) separated by comma (e.g., AAPL,MSFT) or leave empty for general market news"
-                    },
-                    "topics": {
-                        "type": "string",
-                        "description": "Optional: News topics like 'earnings', 'merger', 'technology', etc."
-                    },
-                    "limit": {
-                        "type": "integer",
-                        "description": "Number of articles to return (default: 50, max: 1000)",
-                        "default": 50
-                    }
-                },
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="get_earnings",
-            description="Get earnings data for a company",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "symbol": {"type": "string", "description": "Stock symbol (e.g., AAPL)"}
-                },
-                "required": ["symbol"]
-            }
-        )
-    ]
 
+def _dump(data: dict) -> str:
+    """Serialize a response payload to pretty-printed JSON.
 
-@server.call_tool()
-async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[types.TextContent]:
-    async def make_api_request(url: str) -> dict:
-        """Helper function to make API requests with error handling"""
+    Uses orjson when available (several times faster than stdlib json on
+    the large news-sentiment and time-series payloads), falling back to
+    json.dumps otherwise.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(data, indent=2)
+
+
+def _loads(raw) -> dict:
+    """Parse JSON bytes/str with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _text_content(text: str) -> types.TextContent:
+    """Build a TextContent without re-running pydantic validation.
+
+    The fields are fixed and known-valid, so model_construct skips the
+    per-call validation pass, which shows up on large news payloads.
+    """
+    return types.TextContent.model_construct(type="text", text=text)
+
+
+def _to_text(data: dict) -> str:
+    """Render an API result as the TextContent body.
+
+    Raw passthrough results carry the upstream body verbatim and skip
+    re-serialization; everything else is pretty-printed.
+    """
+    if "__raw__" in data:
+        return data["__raw__"]
+    return _dump(data)
+
+
+def _as_dict(data: dict) -> dict:
+    """Materialize an API result as a dict, parsing raw passthroughs."""
+    if "__raw__" in data:
+        return _loads(data["__raw__"])
+    return data
+
+
+# Cap concurrent upstream requests to stay within Alpha Vantage's rate tier
+_SEM = asyncio.Semaphore(5)
+
+# Successful responses are cached by URL so repeat calls within the TTL
+# skip the network entirely. Quotes and news change intraday, so they get
+# a short TTL; fundamentals and daily series change at most once per day.
+_SHORT_CACHE = TTLCache(maxsize=128, ttl=60)
+_CACHE = TTLCache(maxsize=512, ttl=3600)
+_LOCKS: dict[str, asyncio.Lock] = {}
+
+# On-disk layer behind the in-memory cache, so fundamentals survive a
+# process restart without spending API rate limit again
+_DISK = Cache(os.path.expanduser("~/.cache/alphavantage-mcp"))
+
+
+def _cache_for(url: str) -> TTLCache:
+    if "function=GLOBAL_QUOTE" in url or "function=NEWS_SENTIMENT" in url:
+        return _SHORT_CACHE
+    return _CACHE
+
+
+def _disk_key(url: str) -> str:
+    # _build_url always appends apikey last; strip it so the secret is
+    # never written to disk and entries survive a key rotation
+    return url.split("&apikey=", 1)[0]
+
+
+def _disk_expire_for(url: str) -> int:
+    # Quotes and news go stale in a minute; fundamentals change at most
+    # daily, so they may be reused for a full day across restarts
+    return 60 if _cache_for(url) is _SHORT_CACHE else 86400
+
+
+# Alpha Vantage error payloads are tiny objects with one of these keys
+# first, so scanning the head of the body is enough to detect them
+_ERROR_SENTINELS = ('"Error Message"', '"Note"', '"Information"')
+
+
+async def make_api_request(url: str) -> dict:
+    """Helper function to make API requests with error handling"""
+    cache = _cache_for(url)
+    if url in cache:
+        return cache[url]
+
+    # Per-URL lock so concurrent calls for the same URL make one fetch
+    lock = _LOCKS.setdefault(url, asyncio.Lock())
+    async with lock:
+        if url in cache:
+            return cache[url]
+        data = _DISK.get(_disk_key(url))
+        if data is not None:
+            cache[url] = data
+            return data
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                data = response.json()
-
-                # Check for Alpha Vantage API errors
-                if "Error Message" in data:
-                    return {"error": f"API Error: {data['Error Message']}"}
-                elif "Note" in data:
-                    return {"error": f"API Limit: {data['Note']}"}
-                elif "Information" in data:
-                    return {"error": f"API Info: {data['Information']}"}
+            async with _SEM:
+                try:
+                    response = await _CLIENT.get(url)
+                except httpx.ReadTimeout:
+                    # Retry once after a short backoff before surfacing
+                    # the timeout to the caller
+                    await asyncio.sleep(1.0)
+                    response = await _CLIENT.get(url)
+            response.raise_for_status()
+            text = response.text
 
+            # Happy path: the body looks like a JSON object and carries
+            # no error sentinel near its start, so pass it through
+            # verbatim instead of paying a full parse + re-serialize
+            # round trip. Anything that doesn't start with '{' (a proxy
+            # error page, a truncated body) falls through to _loads,
+            # which raises and surfaces it as an uncached error.
+            head = text[:200]
+            if head.lstrip()[:1] == "{" and not any(sentinel in head for sentinel in _ERROR_SENTINELS):
+                data = {"__raw__": text}
+                cache[url] = data
+                _DISK.set(_disk_key(url), data, expire=_disk_expire_for(url))
                 return data
+
+            data = _loads(text)
+
+            # Check for Alpha Vantage API errors
+            if "Error Message" in data:
+                return {"error": f"API Error: {data['Error Message']}"}
+            elif "Note" in data:
+                return {"error": f"API Limit: {data['Note']}"}
+            elif "Information" in data:
+                return {"error": f"API Info: {data['Information']}"}
+
+            cache[url] = data
+            _DISK.set(_disk_key(url), data, expire=_disk_expire_for(url))
+            return data
         except httpx.TimeoutException:
             return {"error": "Request timed out"}
         except httpx.HTTPStatusError as e:
@@ -152,83 +186,245 @@ async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[types.T
         except Exception as e:
             return {"error": f"Request failed: {str(e)}"}
 
-    if name == "get_stock_quote":
-        symbol = arguments.get("symbol")
-        url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={API_KEY}"
-        data = await make_api_request(url)
-        return [types.TextContent(type="text", text=json.dumps(data, indent=2))]
 
-    elif name == "get_daily_prices":
-        symbol = arguments.get("symbol")
-        url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={symbol}&apikey={API_KEY}"
-        data = await make_api_request(url)
-        return [types.TextContent(type="text", text=json.dumps(data, indent=2))]
+# Tool names are interned so the dispatch dict hashes and compares
+# pointer-identical strings on every call
+_NAME_QUOTE = sys.intern("get_stock_quote")
+_NAME_DAILY = sys.intern("get_daily_prices")
+_NAME_INCOME = sys.intern("get_income_statement")
+_NAME_BALANCE = sys.intern("get_balance_sheet")
+_NAME_CASH_FLOW = sys.intern("get_cash_flow")
+_NAME_OVERVIEW = sys.intern("get_company_overview")
+_NAME_NEWS = sys.intern("get_news_sentiment")
+_NAME_BUNDLE = sys.intern("get_fundamentals_bundle")
+_NAME_EARNINGS = sys.intern("get_earnings")
 
-    elif name == "get_income_statement":
-        symbol = arguments.get("symbol")
-        url = f"https://www.alphavantage.co/query?function=INCOME_STATEMENT&symbol={symbol}&apikey={API_KEY}"
-        data = await make_api_request(url)
-        return [types.TextContent(type="text", text=json.dumps(data, indent=2))]
+# One schema object shared by every symbol-only tool, instead of eight
+# structurally identical dicts
+_SYMBOL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "symbol": {"type": "string", "description": "Stock symbol (e.g., AAPL)"}
+    },
+    "required": ["symbol"]
+}
 
-    elif name == "get_balance_sheet":
-        symbol = arguments.get("symbol")
-        url = f"https://www.alphavantage.co/query?function=BALANCE_SHEET&symbol={symbol}&apikey={API_KEY}"
-        data = await make_api_request(url)
-        return [types.TextContent(type="text", text=json.dumps(data, indent=2))]
+# Tool definitions and URL templates are built once at import time so
+# handle_list_tools and handle_call_tool don't rebuild them per request
+_TOOLS = [
+    types.Tool(
+        name=_NAME_QUOTE,
+        description="Get current stock quote",
+        inputSchema=_SYMBOL_SCHEMA
+    ),
+    types.Tool(
+        name=_NAME_DAILY,
+        description="Get daily time series data for a stock",
+        inputSchema=_SYMBOL_SCHEMA
+    ),
+    types.Tool(
+        name=_NAME_INCOME,
+        description="Get annual income statement for a company",
+        inputSchema=_SYMBOL_SCHEMA
+    ),
+    types.Tool(
+        name=_NAME_BALANCE,
+        description="Get annual balance sheet for a company",
+        inputSchema=_SYMBOL_SCHEMA
+    ),
+    types.Tool(
+        name=_NAME_CASH_FLOW,
+        description="Get annual cash flow statement for a company",
+        inputSchema=_SYMBOL_SCHEMA
+    ),
+    types.Tool(
+        name=_NAME_OVERVIEW,
+        description="Get company overview and key metrics",
+        inputSchema=_SYMBOL_SCHEMA
+    ),
+    types.Tool(
+        name=_NAME_NEWS,
+        description="Get latest news and sentiment for a stock or topic",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "tickers": {
+                    "type": "string",
+                    "description": "Stock symbol(s) separated by comma (e.g., AAPL,MSFT) or leave empty for general market news"
+                },
+                "topics": {
+                    "type": "string",
+                    "description": "Optional: News topics like 'earnings', 'merger', 'technology', etc."
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Number of articles to return (default: 50, max: 1000)",
+                    "default": 50
+                }
+            },
+            "required": []
+        }
+    ),
+    types.Tool(
+        name=_NAME_BUNDLE,
+        description="Get quote, overview, income statement, balance sheet and cash flow for a company in one call",
+        inputSchema=_SYMBOL_SCHEMA
+    ),
+    types.Tool(
+        name=_NAME_EARNINGS,
+        description="Get earnings data for a company",
+        inputSchema=_SYMBOL_SCHEMA
+    )
+]
 
-    elif name == "get_cash_flow":
-        symbol = arguments.get("symbol")
-        url = f"https://www.alphavantage.co/query?function=CASH_FLOW&symbol={symbol}&apikey={API_KEY}"
-        data = await make_api_request(url)
-        return [types.TextContent(type="text", text=json.dumps(data, indent=2))]
+_QUERY_BASE = "https://www.alphavantage.co/query"
 
-    elif name == "get_company_overview":
-        symbol = arguments.get("symbol")
-        url = f"https://www.alphavantage.co/query?function=OVERVIEW&symbol={symbol}&apikey={API_KEY}"
-        data = await make_api_request(url)
-        return [types.TextContent(type="text", text=json.dumps(data, indent=2))]
+# One entry per simple tool: (Alpha Vantage function, required arguments).
+# handle_call_tool looks up the entry and builds the URL generically;
+# only news sentiment and the fundamentals bundle need dedicated branches.
+_DISPATCH = {
+    _NAME_QUOTE: ("GLOBAL_QUOTE", ("symbol",)),
+    _NAME_DAILY: ("TIME_SERIES_DAILY", ("symbol",)),
+    _NAME_INCOME: ("INCOME_STATEMENT", ("symbol",)),
+    _NAME_BALANCE: ("BALANCE_SHEET", ("symbol",)),
+    _NAME_CASH_FLOW: ("CASH_FLOW", ("symbol",)),
+    _NAME_OVERVIEW: ("OVERVIEW", ("symbol",)),
+    _NAME_EARNINGS: ("EARNINGS", ("symbol",)),
+}
 
-    elif name == "get_news_sentiment":
-        tickers = arguments.get("tickers", "")
-        topics = arguments.get("topics", "")
-        limit = arguments.get("limit", 50)
 
-        # Build URL with optional parameters
-        url = f"https://www.alphavantage.co/query?function=NEWS_SENTIMENT&apikey={API_KEY}&limit={limit}"
+def _build_url(function: str, **params: Any) -> str:
+    query = {"function": function, **params, "apikey": API_KEY}
+    return f"{_QUERY_BASE}?{urlencode(query)}"
+
+
+# NEWS_SENTIMENT accepts a comma-separated ticker list, so per-ticker
+# calls arriving within a short window are merged into one upstream
+# request instead of fanning out N API calls. Requests are grouped by
+# (topics, limit); every caller in a window gets the merged response.
+_NEWS_WINDOW = 0.05
+_PENDING_NEWS: dict[tuple[str, int], dict] = {}
+
+
+async def _flush_news(key: tuple[str, int]) -> None:
+    await asyncio.sleep(_NEWS_WINDOW)
+    batch = _PENDING_NEWS.pop(key)
+    topics, limit = key
+
+    params = {"limit": limit}
+    if batch["tickers"]:
+        params["tickers"] = ",".join(batch["tickers"])
+    if topics:
+        params["topics"] = topics
 
-        if tickers:
-            url += f"&tickers={tickers}"
+    try:
+        data = await make_api_request(_build_url("NEWS_SENTIMENT", **params))
+        if not batch["future"].done():
+            batch["future"].set_result(data)
+    except Exception as e:
+        if not batch["future"].done():
+            batch["future"].set_exception(e)
+
+
+async def _fetch_news(tickers: str, topics: str, limit: int) -> dict:
+    if not tickers:
+        # General market news must not inherit tickers from a batch, or
+        # the caller would silently get ticker-filtered results; there
+        # is nothing to merge anyway, so skip the window entirely
+        params = {"limit": limit}
         if topics:
-            url += f"&topics={topics}"
+            params["topics"] = topics
+        return await make_api_request(_build_url("NEWS_SENTIMENT", **params))
+
+    key = (topics, limit)
+    batch = _PENDING_NEWS.get(key)
+    if batch is None:
+        loop = asyncio.get_running_loop()
+        batch = {"tickers": [], "future": loop.create_future()}
+        _PENDING_NEWS[key] = batch
+        batch["task"] = loop.create_task(_flush_news(key))
+
+    for ticker in tickers.split(","):
+        ticker = ticker.strip()
+        if ticker and ticker not in batch["tickers"]:
+            batch["tickers"].append(ticker)
+
+    # The future is shared by every caller in the window; shield it so
+    # one caller's cancellation doesn't fail the rest of the batch
+    return await asyncio.shield(batch["future"])
+
+
+# Prebuilt result model: the SDK passes it straight through instead of
+# constructing and validating a fresh ListToolsResult per list_tools call
+_LIST_TOOLS_RESULT = types.ListToolsResult(tools=_TOOLS)
+
+
+@server.list_tools()
+async def handle_list_tools() -> types.ListToolsResult:
+    return _LIST_TOOLS_RESULT
 
-        data = await make_api_request(url)
-        return [types.TextContent(type="text", text=json.dumps(data, indent=2))]
 
-    elif name == "get_earnings":
+@server.call_tool()
+async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[types.TextContent]:
+    if name == _NAME_NEWS:
+        tickers = arguments.get("tickers", "")
+        topics = arguments.get("topics", "")
+        limit = arguments.get("limit", 50)
+
+        data = await _fetch_news(tickers, topics, limit)
+        return [_text_content(_to_text(data))]
+
+    elif name == _NAME_BUNDLE:
         symbol = arguments.get("symbol")
-        url = f"https://www.alphavantage.co/query?function=EARNINGS&symbol={symbol}&apikey={API_KEY}"
-        data = await make_api_request(url)
-        return [types.TextContent(type="text", text=json.dumps(data, indent=2))]
+        endpoints = {
+            "quote": "GLOBAL_QUOTE",
+            "overview": "OVERVIEW",
+            "income_statement": "INCOME_STATEMENT",
+            "balance_sheet": "BALANCE_SHEET",
+            "cash_flow": "CASH_FLOW",
+        }
+        urls = [_build_url(function, symbol=symbol) for function in endpoints.values()]
+        # All five endpoints are fetched concurrently (gated by _SEM),
+        # so the bundle finishes in the slowest round trip, not the sum
+        results = await asyncio.gather(*(make_api_request(url) for url in urls))
+        data = {key: _as_dict(result) for key, result in zip(endpoints.keys(), results)}
+        return [_text_content(_dump(data))]
 
-    else:
+    entry = _DISPATCH.get(name)
+    if entry is None:
         raise ValueError(f"Unknown tool: {name}")
 
+    function, required = entry
+    url = _build_url(function, **{param: arguments.get(param) for param in required})
+    data = await make_api_request(url)
+    return [_text_content(_to_text(data))]
+
 
 async def main():
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="alphavantage",
-                server_version="0.2.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+    try:
+        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="alphavantage",
+                    server_version="0.2.0",
+                    capabilities=server.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
+            )
+    finally:
+        await _CLIENT.aclose()
 
 
 if __name__ == "__main__":
+    try:
+        # uvloop's libuv-based event loop is 2-4x faster on network-heavy
+        # async workloads; unavailable on Windows, so fall back to stdlib
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())
\ No newline at end of file